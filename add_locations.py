@@ -1,12 +1,12 @@
 import asyncio
+import csv
 import os
 import random
-import string
-
-import pandas as pd
 
 from sqlalchemy import insert
 
+from app.api.delivery_car.service import generate_unique_numbers
+from app.api.etag import bump_version
 from app.db.models import locations, delivery_cars
 from app.db.database import async_session_maker
 
@@ -17,16 +17,16 @@ async def insert_locations():
     Функция, которая предварительно загружает локации в БД.
 
     """
-    columns_to_keep = ['city', 'state_name', 'zip', 'lat', 'lng']
     current_dir = os.path.dirname(os.path.abspath(__file__))
 
     file_path = os.path.join(current_dir, 'uszips.csv')
-    df = pd.read_csv(file_path, usecols=columns_to_keep)
+    with open(file_path, newline='', encoding='utf-8') as file:
+        rows = list(csv.DictReader(file))
 
     async with async_session_maker() as session:
-        for row in df.itertuples(index=False):
-            stmt = insert(locations).values(city=row.city, state_name=row.state_name,
-                                            zip=row.zip, lat=row.lat, lng=row.lng)
+        for row in rows:
+            stmt = insert(locations).values(city=row['city'], state_name=row['state_name'],
+                                            zip=int(row['zip']), lat=float(row['lat']), lng=float(row['lng']))
             await session.execute(stmt)
             await session.commit()
 
@@ -36,18 +36,18 @@ async def add_cars():
                          647]
     random.shuffle(current_locations)
 
-    default_cars = []
-    for _ in range(20):
-        number_car = ''.join(random.choices(string.digits, k=4)) + random.choice(string.ascii_uppercase)
-        carrying = random.randint(0, 1000)
-        default_cars.append({
-            "number_car": number_car,
-            "current_location": current_locations.pop(),
-            "carrying": carrying
-        })
     async with async_session_maker() as session:
+        default_cars = []
+        for number_car in await generate_unique_numbers(20, session):
+            carrying = random.randint(0, 1000)
+            default_cars.append({
+                "number_car": number_car,
+                "current_location": current_locations.pop(),
+                "carrying": carrying
+            })
         stmt = insert(delivery_cars).values(default_cars)
         await session.execute(stmt)
+        await bump_version(session, 'delivery_cars')
         await session.commit()
 
 
@@ -0,0 +1,168 @@
+import asyncio
+import random
+import string
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import delivery_cars
+
+LETTERS = string.ascii_uppercase
+POOL_CAPACITY = 10000 * len(LETTERS)
+
+
+class NumberPoolExhausted(Exception):
+    pass
+
+
+def number_to_index(number_car: str) -> Optional[int]:
+    """
+
+    Функция, которая переводит номер автомобиля формата \\d{4}[A-Z] в индекс пула.
+
+    Принимает 1 аргумент:
+    - number_car - номер автомобиля.
+
+    Возвращает индекс или None, если номер не соответствует формату.
+
+    """
+    if len(number_car) != 5 or not number_car[:4].isdigit() or number_car[4] not in LETTERS:
+        return None
+    return int(number_car[:4]) * len(LETTERS) + LETTERS.index(number_car[4])
+
+
+def index_to_number(index: int) -> str:
+    """
+
+    Функция, которая переводит индекс пула в номер автомобиля.
+
+    Принимает 1 аргумент:
+    - index - индекс номера в пуле.
+
+    Возвращает номер автомобиля.
+
+    """
+    digits, letter = divmod(index, len(LETTERS))
+    return f'{digits:04d}{LETTERS[letter]}'
+
+
+def build_free_list(used: bytes) -> list[int]:
+    """
+
+    Функция, которая строит перемешанный список свободных индексов пула.
+
+    Принимает 1 аргумент:
+    - used - битовая карта занятых номеров.
+
+    Возвращает список свободных индексов.
+
+    """
+    free = [index for index in range(POOL_CAPACITY) if not used[index]]
+    random.shuffle(free)
+    return free
+
+
+class NumberCarPool:
+    """
+
+    Пул свободных номеров автомобилей.
+
+    Хранит перемешанный список свободных индексов и битовую карту занятых номеров.
+    Список строится один раз при первом обращении (в отдельном потоке, чтобы не блокировать event loop).
+    После коллизии с номером, занятым другим процессом, пул дочитывает из delivery_cars только
+    автомобили с id больше последнего прочитанного и помечает их номера занятыми - список не перестраивается,
+    reserve просто пропускает занятые индексы. Выдача номера занимает O(1) и не требует обращения к БД.
+
+    """
+
+    def __init__(self):
+        self._used = bytearray(POOL_CAPACITY)
+        self._free: list[int] = []
+        self._loaded = False
+        self._last_id = 0
+        self._lock = asyncio.Lock()
+
+    async def reconcile(self, session: AsyncSession):
+        """
+
+        Функция, которая помечает занятыми номера автомобилей, добавленных в БД после прошлой сверки.
+
+        Принимает 1 аргумент:
+        - session - экземпляр, который обеспечивает асинхронное взаимодействие с БД.
+
+        """
+        query = select(delivery_cars.c.id, delivery_cars.c.number_car).where(delivery_cars.c.id > self._last_id)
+        result = await session.execute(query)
+        for car_id, number_car in result.fetchall():
+            self.mark_used(number_car)
+            self._last_id = max(self._last_id, car_id)
+
+    async def _load(self, session: AsyncSession):
+        await self.reconcile(session)
+        self._free = await asyncio.to_thread(build_free_list, bytes(self._used))
+        self._loaded = True
+
+    async def reserve(self, session: AsyncSession, count: int = 1, refresh: bool = False) -> list[str]:
+        """
+
+        Функция, которая резервирует свободные номера автомобилей.
+
+        Принимает 3 аргумента:
+        - session - экземпляр, который обеспечивает асинхронное взаимодействие с БД.
+        - count - количество необходимых номеров.
+        - refresh - дочитать новые номера из БД (после коллизии с номером, занятым другим процессом).
+
+        Возвращает список номеров. Если свободных номеров не хватает, вызывает NumberPoolExhausted.
+
+        """
+        async with self._lock:
+            if not self._loaded:
+                await self._load(session)
+            elif refresh:
+                await self.reconcile(session)
+            numbers = []
+            while len(numbers) < count:
+                if not self._free:
+                    self.release(numbers)
+                    raise NumberPoolExhausted('Свободные номера автомобилей закончились')
+                index = self._free.pop()
+                if self._used[index]:
+                    continue
+                self._used[index] = 1
+                numbers.append(index_to_number(index))
+            return numbers
+
+    def mark_used(self, number_car: str):
+        """
+
+        Функция, которая помечает номер как занятый (например, номер, заданный пользователем).
+
+        Принимает 1 аргумент:
+        - number_car - номер автомобиля.
+
+        """
+        index = number_to_index(number_car)
+        if index is not None:
+            self._used[index] = 1
+
+    def release(self, numbers: list[str]):
+        """
+
+        Функция, которая возвращает в пул номера, которые не удалось записать в БД.
+
+        Принимает 1 аргумент:
+        - numbers - список номеров автомобилей.
+
+        """
+        for number_car in numbers:
+            index = number_to_index(number_car)
+            if index is None or not self._used[index]:
+                continue
+            self._used[index] = 0
+            position = random.randint(0, len(self._free))
+            self._free.append(index)
+            self._free[position], self._free[-1] = self._free[-1], self._free[position]
+
+
+number_car_pool = NumberCarPool()
@@ -1,12 +1,15 @@
-from typing import Union
+from typing import Union, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response, Header
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
 from app.api.delivery_car.schemas import GetDeliveryCar, CreateDeliveryCar, ErrorResponse, DataUpdateCar
 from app.api.delivery_car.service import get_all_deliv_cars, update_car_by_id, \
 	create_new_delivery_car
+from app.api.etag import get_etag, is_not_modified
+from app.api.idempotency import run_idempotent
+from app.api.formats import wants_msgpack, msgpack_response
 from app.db.database import get_async_session
 
 # Роутер для управления автомобилями.
@@ -16,15 +19,33 @@ router = APIRouter(
 
 
 # Роутер получения списка всех имеющихся автомобилей.
+# Отвечает 304, если ETag клиента актуален: одно чтение версии по первичному ключу, без запроса списка.
+# При Accept: application/x-msgpack возвращает колонки в формате MessagePack.
 @router.get('/delivery_cars', response_model=list[GetDeliveryCar])
-async def get_all_delivery_cars(answer=Depends(get_all_deliv_cars)):
+async def get_all_delivery_cars(request: Request, response: Response,
+								session: AsyncSession = Depends(get_async_session)):
+	columnar = wants_msgpack(request)
+	etag = await get_etag(session, 'delivery_cars', variant='msgpack' if columnar else '')
+	headers = {'ETag': etag, 'Vary': 'Accept'}
+	if is_not_modified(request, etag):
+		return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+	answer = await get_all_deliv_cars(session)
+	if columnar:
+		return msgpack_response(answer, GetDeliveryCar, headers)
+	response.headers.update(headers)
 	return answer
 
 
 # Роутер создания автомобилей.
+# С заголовком Idempotency-Key повторный запрос возвращает сохранённый ответ, не создавая автомобиль заново.
 @router.post('/delivery_cars', response_model=Union[GetDeliveryCar, ErrorResponse], status_code=status.HTTP_201_CREATED)
-async def create_delivery_car(data_delivery_car: CreateDeliveryCar, session: AsyncSession = Depends(get_async_session)):
-	answer = await create_new_delivery_car(data_delivery_car, session)
+async def create_delivery_car(data_delivery_car: CreateDeliveryCar, session: AsyncSession = Depends(get_async_session),
+							  idempotency_key: Optional[str] = Header(None)):
+	if idempotency_key is None:
+		answer = await create_new_delivery_car(data_delivery_car, session)
+		return answer
+	answer = await run_idempotent(f'/delivery_cars:{idempotency_key}', data_delivery_car, session,
+								  lambda before_commit: create_new_delivery_car(data_delivery_car, session, before_commit))
 	return answer
 
 
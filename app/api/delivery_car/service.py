@@ -1,17 +1,21 @@
-import random
 import re
-import string
-from typing import Union
+from typing import Union, Optional, Callable, Awaitable
 
 from fastapi import Depends
 from sqlalchemy import select, insert, func, exists, update
 from sqlalchemy import exc
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.etag import bump_version
+from app.api.delivery_car.number_pool import number_car_pool, NumberPoolExhausted
 from app.api.delivery_car.schemas import CreateDeliveryCar, GetDeliveryCar, DataUpdateCar, ErrorResponse
+from app.db.errors import get_sqlstate, is_input_error, UNIQUE_VIOLATION, FOREIGN_KEY_VIOLATION, CHECK_VIOLATION
 from app.db.models import delivery_cars, locations
 from app.db.database import get_async_session
 
+# Количество попыток вставки автомобиля, если сгенерированный номер занял другой процесс.
+MAX_INSERT_ATTEMPTS = 3
+
 
 async def get_all_deliv_cars(session: AsyncSession = Depends(get_async_session)) -> list[GetDeliveryCar]:
     """
@@ -31,20 +35,27 @@ async def get_all_deliv_cars(session: AsyncSession = Depends(get_async_session))
     return info
 
 
-async def create_new_delivery_car(data_car: CreateDeliveryCar, session) -> Union[GetDeliveryCar, ErrorResponse]:
+async def create_new_delivery_car(data_car: CreateDeliveryCar, session,
+                                  before_commit: Optional[Callable[[GetDeliveryCar], Awaitable[None]]] = None) -> \
+        Union[GetDeliveryCar, ErrorResponse]:
     """
 
     Функция, которая создаёт новый автомобиль для доставки груза.
 
-    Принимает 2 аргумент:
+    Принимает 3 аргумента:
     - data_car -A.
     - session - экземпляр, который обеспечивает асинхронное взаимодействие с БД.
+    - before_commit - необязательная функция, которая получает созданный автомобиль и выполняется в той же
+    транзакции перед коммитом (например, сохранение ответа для Idempotency-Key).
     Возвращает объект класса delivery_cars.
 
     """
+    generated = not await check_unique_number_format(data_car.number_car)
+    # Номер, выданный пулом и ещё не записанный в БД: только его можно вернуть в пул при ошибке.
+    reserved_number = None
     try:
-        if not await check_unique_number_format(data_car.number_car):
-            data_car.number_car = await generate_unique_number()
+        if generated:
+            reserved_number = data_car.number_car = await generate_unique_number(session)
 
         if not data_car.current_location:
             exists_query = select(exists().where(locations.c.zip == data_car.current_location))
@@ -52,22 +63,65 @@ async def create_new_delivery_car(data_car: CreateDeliveryCar, session) -> Union
             if not result.scalar():
                 data_car.current_location = await get_random_zip(session)
 
-        query = insert(delivery_cars).values(number_car=data_car.number_car, current_location=data_car.current_location,
-                                             carrying=data_car.carrying).returning(delivery_cars)
-        res_query = await session.execute(query)
-        answer = res_query.fetchone()
-        await session.commit()
+        for attempt in range(MAX_INSERT_ATTEMPTS):
+            try:
+                # Вставка в точке сохранения: коллизия откатывает только её, а не всю транзакцию.
+                async with session.begin_nested():
+                    query = insert(delivery_cars).values(number_car=data_car.number_car,
+                                                         current_location=data_car.current_location,
+                                                         carrying=data_car.carrying).returning(delivery_cars)
+                    res_query = await session.execute(query)
+                    answer = res_query.fetchone()
+                break
+            except exc.IntegrityError as e:
+                collided = generated and get_sqlstate(e) == UNIQUE_VIOLATION
+                if collided:
+                    # Номер уже занят в БД другим процессом и в пул не возвращается.
+                    number_car_pool.mark_used(reserved_number)
+                    reserved_number = None
+                if not collided or attempt == MAX_INSERT_ATTEMPTS - 1:
+                    raise
+                # Дочитываем новые номера из БД и берём следующий свободный номер.
+                reserved_number = data_car.number_car = await generate_unique_number(session, refresh=True)
         info = GetDeliveryCar(id=answer.id, number_car=answer.number_car, current_location=answer.current_location,
                               carrying=answer.carrying)
+        if before_commit:
+            await before_commit(info)
+        await bump_version(session, 'delivery_cars')
+        await session.commit()
+        number_car_pool.mark_used(answer.number_car)
         return info
-    except exc.IntegrityError as e:
-        error_message = str(e).split(': ')[2].split('\n')[0]
-        error = ErrorResponse(error=error_message)
-        return error
+    except NumberPoolExhausted as e:
+        return ErrorResponse(error=str(e))
     except exc.DBAPIError as e:
-        error_message = str(e).split(': ')[1].split("\n")[0]
-        error = ErrorResponse(error=error_message)
-        return error
+        await session.rollback()
+        if reserved_number is not None:
+            number_car_pool.release([reserved_number])
+        if not is_input_error(e):
+            raise
+        return ErrorResponse(error=get_car_error_message(e, data_car))
+
+
+def get_car_error_message(error: exc.DBAPIError, data_car: CreateDeliveryCar) -> str:
+    """
+
+    Функция, которая формирует сообщение об ошибке создания автомобиля по коду ошибки PostgreSQL.
+
+    Принимает 2 аргумента:
+    - error - исключение DBAPIError (или IntegrityError).
+    - data_car - schema pydantic c атрибутами создаваемого автомобиля.
+
+    Возвращает сообщение об ошибке.
+
+    """
+    sqlstate = get_sqlstate(error)
+    if sqlstate == UNIQUE_VIOLATION:
+        return f"Автомобиль с номером {data_car.number_car} уже существует"
+    if sqlstate == FOREIGN_KEY_VIOLATION:
+        return f"Локации {data_car.current_location} не существует"
+    if sqlstate == CHECK_VIOLATION:
+        return "Грузоподъёмность автомобиля должна быть от 0 до 1000"
+    return "Некорректные данные автомобиля"
 
 
 async def update_car_by_id(car_id: int, update_values: DataUpdateCar, session: AsyncSession) -> \
@@ -91,25 +145,44 @@ async def update_car_by_id(car_id: int, update_values: DataUpdateCar, session: A
         values(current_location=update_values.current_location).returning(delivery_cars)
     result_stmt = await session.execute(stmt)
     result = result_stmt.fetchone()
+    await bump_version(session, 'delivery_cars')
     await session.commit()
     rezult_data = GetDeliveryCar(id=result[0], number_car=result[1], current_location=result[2],
                  carrying=result[3])
     return rezult_data
 
 
-async def generate_unique_number():
+async def generate_unique_number(session: AsyncSession, refresh: bool = False) -> str:
     """
 
-    Функция, которая генерирует уникальный номер автомобиля.
+    Функция, которая выдаёт свободный уникальный номер автомобиля из пула номеров.
+
+    Принимает 2 аргумента:
+    - session - экземпляр, который обеспечивает асинхронное взаимодействие с БД.
+    - refresh - сверить пул с БД перед выдачей номера (после коллизии с другим процессом).
+
     Возвращает unique_number.
 
     """
-    number = random.randint(1000, 9999)
-    letter = random.choice(string.ascii_uppercase)
-    unique_number = str(number) + letter
+    unique_number, = await number_car_pool.reserve(session, refresh=refresh)
     return unique_number
 
 
+async def generate_unique_numbers(count: int, session: AsyncSession) -> list[str]:
+    """
+
+    Функция, которая резервирует сразу несколько свободных номеров автомобилей (для массового создания).
+
+    Принимает 2 аргумента:
+    - count - количество необходимых номеров.
+    - session - экземпляр, который обеспечивает асинхронное взаимодействие с БД.
+
+    Возвращает список номеров.
+
+    """
+    return await number_car_pool.reserve(session, count)
+
+
 async def get_random_zip(session: AsyncSession):
     """
 
@@ -0,0 +1,68 @@
+from fastapi import Request
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import resource_versions
+
+
+async def bump_version(session: AsyncSession, resource: str):
+	"""
+
+	Функция, которая увеличивает версию ресурса в той же транзакции, что и изменение его данных.
+	Вызывается до session.commit(), поэтому версия меняется только вместе с данными.
+
+	UPDATE блокирует строку ресурса в resource_versions до конца транзакции, то есть записи одного ресурса
+	выполняются последовательно. Поэтому bump_version должен быть последним запросом перед session.commit():
+	блокировка удерживается только на время коммита, а не на время остальных запросов записи.
+
+	Принимает 2 аргумента:
+	- session - экземпляр, который обеспечивает асинхронное взаимодействие с БД.
+	- resource - название ресурса (goods | delivery_cars).
+
+	"""
+	stmt = update(resource_versions).where(resource_versions.c.resource == resource).\
+		values(version=resource_versions.c.version + 1)
+	await session.execute(stmt)
+
+
+async def get_etag(session: AsyncSession, *resources: str, variant: str = '') -> str:
+	"""
+
+	Функция, которая формирует ETag по текущим версиям ресурсов из таблицы resource_versions.
+
+	Принимает произвольное количество аргументов:
+	- session - экземпляр, который обеспечивает асинхронное взаимодействие с БД.
+	- resources - названия ресурсов, от которых зависит ответ.
+	- variant - формат представления ответа (например, msgpack), чтобы разные форматы имели разные ETag.
+
+	Возвращает значение заголовка ETag. ETag слабый (W/), так как один и тот же ответ
+	отдаётся и без сжатия, и сжатым gzip.
+
+	"""
+	query = select(resource_versions.c.resource, resource_versions.c.version).\
+		where(resource_versions.c.resource.in_(resources))
+	result = await session.execute(query)
+	versions = dict(result.fetchall())
+	tag = '-'.join(str(versions.get(resource, 0)) for resource in resources)
+	if variant:
+		tag += f'-{variant}'
+	return f'W/"{tag}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+	"""
+
+	Функция, которая проверяет, совпадает ли ETag из заголовка If-None-Match с текущим (слабое сравнение).
+
+	Принимает 2 аргумента:
+	- request - входящий запрос.
+	- etag - текущий ETag ресурса.
+
+	Возвращает True | False.
+
+	"""
+	if_none_match = request.headers.get('if-none-match')
+	if not if_none_match:
+		return False
+	tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+	return '*' in tags or etag.removeprefix('W/') in tags
@@ -0,0 +1,88 @@
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+MSGPACK_MEDIA_TYPE = 'application/x-msgpack'
+
+# Минимальный размер ответа (в байтах), начиная с которого ответ сжимается gzip.
+GZIP_MINIMUM_SIZE = 1024
+
+
+def parse_accept(accept: str) -> dict[str, float]:
+	"""
+
+	Функция, которая разбирает заголовок Accept на типы содержимого и их веса (q).
+
+	Принимает 1 аргумент:
+	- accept - значение заголовка Accept.
+
+	Возвращает словарь {тип содержимого: q}.
+
+	"""
+	media_ranges = {}
+	for media_range in accept.split(','):
+		media_type, *params = [part.strip() for part in media_range.split(';')]
+		if not media_type:
+			continue
+		quality = 1.0
+		for param in params:
+			name, _, value = param.partition('=')
+			if name.strip().lower() == 'q':
+				try:
+					quality = float(value)
+				except ValueError:
+					quality = 0.0
+		media_ranges[media_type.lower()] = quality
+	return media_ranges
+
+
+def wants_msgpack(request: Request) -> bool:
+	"""
+
+	Функция, которая проверяет, предпочитает ли клиент колоночный формат MessagePack (заголовок Accept).
+	MessagePack выбирается, если его вес больше 0, больше веса application/json и не меньше веса шаблонов */*.
+
+	Принимает 1 аргумент:
+	- request - входящий запрос.
+
+	Возвращает True | False.
+
+	"""
+	media_ranges = parse_accept(request.headers.get('accept', ''))
+	msgpack_quality = media_ranges.get(MSGPACK_MEDIA_TYPE, 0.0)
+	json_quality = media_ranges.get('application/json', 0.0)
+	wildcard_quality = max(media_ranges.get('application/*', 0.0), media_ranges.get('*/*', 0.0))
+	return msgpack_quality > 0 and msgpack_quality > json_quality and msgpack_quality >= wildcard_quality
+
+
+def to_columns(items: list[BaseModel], model: type[BaseModel]) -> dict[str, list]:
+	"""
+
+	Функция, которая переводит список объектов в колонки: {поле: [значения]}.
+
+	Принимает 2 аргумента:
+	- items - список schema pydantic.
+	- model - класс schema pydantic, задающий набор колонок.
+
+	Возвращает словарь колонок.
+
+	"""
+	return {field: [getattr(item, field) for item in items] for field in model.model_fields}
+
+
+def msgpack_response(items: list[BaseModel], model: type[BaseModel], headers: dict) -> Response:
+	"""
+
+	Функция, которая формирует ответ в колоночном формате MessagePack.
+
+	Принимает 3 аргумента:
+	- items - список schema pydantic.
+	- model - класс schema pydantic, задающий набор колонок.
+	- headers - дополнительные заголовки ответа.
+
+	Возвращает Response.
+
+	"""
+	import msgpack
+
+	content = msgpack.packb(to_columns(items, model))
+	return Response(content=content, media_type=MSGPACK_MEDIA_TYPE, headers=headers)
@@ -1,6 +1,6 @@
-from typing import Union
+from typing import Union, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response, Header
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
@@ -8,6 +8,9 @@ from app.api.goods.schemas import CreateGoods, GetGoods, GetListGoods, GetGoodsB
 	DeleteGoods
 from app.api.goods.service import create_new_goods, get_all_list_goods, get_goods_id, update_goods_by_id, \
 	delete_goods_by_id
+from app.api.etag import get_etag, is_not_modified
+from app.api.idempotency import run_idempotent
+from app.api.formats import wants_msgpack, msgpack_response
 from app.db.database import get_async_session
 
 # Роутер для управления грузами.
@@ -17,8 +20,25 @@ router = APIRouter(
 
 
 # Роутер получения списка всех имеющихся грузов.
+# Отвечает 304, если ETag клиента актуален: одно чтение версий по первичному ключу, без запроса списка
+# и без пересчёта расстояний.
+# При Accept: application/x-msgpack возвращает колонки в формате MessagePack.
 @router.get('/goods', response_model=Union[list[GetListGoods], ErrorResponse])
-async def get_all_goods(answer=Depends(get_all_list_goods)):
+async def get_all_goods(request: Request, response: Response, session: AsyncSession = Depends(get_async_session)):
+	columnar = wants_msgpack(request)
+	# Список грузов зависит и от грузов, и от расположения автомобилей.
+	etag = await get_etag(session, 'goods', 'delivery_cars', variant='msgpack' if columnar else '')
+	headers = {'ETag': etag, 'Vary': 'Accept'}
+	if is_not_modified(request, etag):
+		return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+	answer = await get_all_list_goods(session)
+	if not isinstance(answer, list):
+		# Ответ с ошибкой всегда отдаётся в JSON и без ETag, чтобы клиент не получил 304 на ошибку.
+		response.headers['Vary'] = 'Accept'
+		return answer
+	if columnar:
+		return msgpack_response(answer, GetListGoods, headers)
+	response.headers.update(headers)
 	return answer
 
 
@@ -30,9 +50,15 @@ async def get_goods_by_id(goods_id: int, session: AsyncSession = Depends(get_asy
 
 
 # Роутер создания груза.
+# С заголовком Idempotency-Key повторный запрос возвращает сохранённый ответ, не создавая груз заново.
 @router.post('/goods', response_model=Union[GetGoods, ErrorResponse], status_code=status.HTTP_201_CREATED)
-async def create_goods(data_goods: CreateGoods, session: AsyncSession = Depends(get_async_session)):
-	answer = await create_new_goods(data_goods, session)
+async def create_goods(data_goods: CreateGoods, session: AsyncSession = Depends(get_async_session),
+					   idempotency_key: Optional[str] = Header(None)):
+	if idempotency_key is None:
+		answer = await create_new_goods(data_goods, session)
+		return answer
+	answer = await run_idempotent(f'/goods:{idempotency_key}', data_goods, session,
+								  lambda before_commit: create_new_goods(data_goods, session, before_commit))
 	return answer
 
 
@@ -1,12 +1,13 @@
-from typing import Union
+from functools import lru_cache
+from typing import Union, Optional, Callable, Awaitable
 
 from fastapi import Depends
-from geopy.distance import geodesic
 from sqlalchemy import select, insert, update, delete
 from sqlalchemy.exc import IntegrityError, DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.goods.schemas import CreateGoods, GetGoods, DataUpdateGoods, ErrorResponse, DeleteGoods, GetListGoods, \
 	GetGoodsByID
+from app.api.etag import bump_version
 from app.db.models import goods, locations, delivery_cars
 from app.db.database import get_async_session
 
@@ -70,14 +71,18 @@ async def get_goods_id(goods_id: int, session: AsyncSession) -> Union[GetGoodsBy
 	return answer
 
 
-async def create_new_goods(data_goods: CreateGoods, session) -> Union[GetGoods, ErrorResponse]:
+async def create_new_goods(data_goods: CreateGoods, session,
+						   before_commit: Optional[Callable[[GetGoods], Awaitable[None]]] = None) -> \
+		Union[GetGoods, ErrorResponse]:
 	"""
 
 	Функция, которая создаёт груз.
 
-	Принимает 2 аргумент:
+	Принимает 3 аргумента:
 	- data_goods - schema pydantic c необходимыми атрибутами для создания объекта класса goods.
 	- session - экземпляр, который обеспечивает асинхронное взаимодействие с БД.
+	- before_commit - необязательная функция, которая получает созданный груз и выполняется в той же
+	транзакции перед коммитом (например, сохранение ответа для Idempotency-Key).
 	Возвращает объект класса goods.
 
 	"""
@@ -86,16 +91,20 @@ async def create_new_goods(data_goods: CreateGoods, session) -> Union[GetGoods,
 									 weight=data_goods.weight, description=data_goods.description).returning(goods)
 		res_query = await session.execute(query)
 		answer = res_query.fetchone()
-		await session.commit()
-
 		info = GetGoods(id=answer.id, pick_up=answer.pick_up, description=answer.description,
 						delivery=answer.delivery, weight=answer.weight)
+		if before_commit:
+			await before_commit(info)
+		await bump_version(session, 'goods')
+		await session.commit()
 		return info
 	except IntegrityError as e:
+		await session.rollback()
 		error_message = str(e).split(': ')[2].split('\n')[0]
 		error = ErrorResponse(error=error_message)
 		return error
 	except DBAPIError as e:
+		await session.rollback()
 		error_message = str(e).split(': ')[1].split("\n")[0]
 		error = ErrorResponse(error=error_message)
 		return error
@@ -120,6 +129,7 @@ async def update_goods_by_id(goods_id: int, update_values: DataUpdateGoods, sess
 	result = result_stmt.fetchone()
 	if not result:
 		return {"error": "Некорректный id груза."}
+	await bump_version(session, 'goods')
 	await session.commit()
 	info = GetGoods(id=result.id, pick_up=result.pick_up, description=result.description,
 					delivery=result.delivery, weight=result.weight)
@@ -142,11 +152,25 @@ async def delete_goods_by_id(goods_id: int, session: AsyncSession) -> DeleteGood
 	stmt = delete(goods).where(goods.c.id == goods_id)
 	result = await session.execute(stmt)
 	if result.rowcount:
+		await bump_version(session, 'goods')
 		await session.commit()
 		return DeleteGoods(status=True, message=f"Груз c id={goods_id} удален")
 	return DeleteGoods(status=False, message=f"Груз c id={goods_id} не удален, проверьте данные.")
 
 
+@lru_cache(maxsize=None)
+def get_geodesic():
+	"""
+
+	Функция, которая лениво импортирует geopy при первом обращении, чтобы не замедлять запуск приложения.
+
+	Возвращает функцию geodesic.
+
+	"""
+	from geopy.distance import geodesic
+	return geodesic
+
+
 async def add_info_about_cars(goods_with_coordinates, cars_with_coordinates) -> Union[GetGoodsByID, GetListGoods]:
 	"""
 
@@ -159,6 +183,7 @@ async def add_info_about_cars(goods_with_coordinates, cars_with_coordinates) ->
 	Возвращает GetGoodsByID | GetListGoods.
 
 	"""
+	geodesic = get_geodesic()
 
 	car_info = []
 	for goods_coord in goods_with_coordinates:
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Request
+from starlette import status
+from starlette.responses import JSONResponse
+
+# Роутер для проверки состояния приложения.
+router = APIRouter(
+	tags=['Health']
+)
+
+
+# Роутер проверки готовности: отвечает 200 только после прогрева пула БД и geo-зависимостей.
+@router.get('/ready')
+async def ready(request: Request):
+	if not getattr(request.app.state, 'ready', False):
+		return JSONResponse({"status": "starting"}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+	return {"status": "ready"}
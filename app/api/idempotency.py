@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Awaitable, Callable, Optional
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import async_session_maker
+from app.db.models import idempotency_keys
+
+# Время хранения ответа по ключу идемпотентности.
+IDEMPOTENCY_TTL = timedelta(hours=24)
+
+# Количество ключей в LRU-кэше в памяти.
+LRU_SIZE = 1024
+
+# Период очистки таблицы idempotency_keys от просроченных ключей (в секундах).
+PURGE_INTERVAL = 3600
+
+# LRU-кэш: ключ -> (время истечения по time.monotonic(), хэш запроса, ответ).
+_cache: OrderedDict[str, tuple[float, str, dict]] = OrderedDict()
+
+# Запросы, выполняемые в этом процессе: повторы с тем же ключом ждут их результата.
+_in_flight: dict[str, asyncio.Future] = {}
+
+logger = logging.getLogger(__name__)
+
+
+def _cache_get(key: str) -> Optional[tuple[float, str, dict]]:
+	entry = _cache.get(key)
+	if entry is None:
+		return None
+	if entry[0] < time.monotonic():
+		del _cache[key]
+		return None
+	_cache.move_to_end(key)
+	return entry
+
+
+def _cache_put(key: str, stored: tuple[float, str, dict]):
+	_cache[key] = stored
+	_cache.move_to_end(key)
+	if len(_cache) > LRU_SIZE:
+		_cache.popitem(last=False)
+
+
+def _replay(stored: tuple[float, str, dict], request_hash: str) -> dict:
+	_, stored_hash, response = stored
+	if stored_hash != request_hash:
+		return {"error": "Idempotency-Key уже использован с другими данными запроса"}
+	return response
+
+
+def expired_keys_condition():
+	return idempotency_keys.c.created_at < func.now() - IDEMPOTENCY_TTL
+
+
+def reserve_key_statement(key: str, request_hash: str):
+	return insert(idempotency_keys).values(key=key, request_hash=request_hash).\
+		on_conflict_do_nothing(index_elements=[idempotency_keys.c.key]).returning(idempotency_keys.c.key)
+
+
+async def _reserve(key: str, request_hash: str, session: AsyncSession) -> Optional[tuple[float, str, dict]]:
+	"""
+
+	Функция, которая резервирует ключ идемпотентности в текущей (не закоммиченной) транзакции.
+	Резерв фиксируется только вместе с созданным объектом и его ответом. Если тот же ключ держит
+	незавершённая транзакция другого запроса, INSERT ждёт её завершения: после коммита возвращается
+	сохранённый ответ, после отката ключ резервируется этим запросом.
+
+	Принимает 3 аргумента:
+	- key - ключ идемпотентности.
+	- request_hash - хэш данных запроса.
+	- session - экземпляр, который обеспечивает асинхронное взаимодействие с БД.
+
+	Возвращает None, если ключ зарезервирован этим запросом, иначе сохранённые
+	(время истечения по time.monotonic(), хэш запроса, ответ).
+
+	"""
+	await session.execute(delete(idempotency_keys).where(idempotency_keys.c.key == key, expired_keys_condition()))
+	result = await session.execute(reserve_key_statement(key, request_hash))
+	if result.scalar() is not None:
+		return None
+
+	# Возраст строки считается в БД, чтобы срок жизни в кэше отсчитывался от created_at.
+	age = func.extract('epoch', func.now() - idempotency_keys.c.created_at).label('age')
+	query = select(idempotency_keys.c.request_hash, idempotency_keys.c.response, age).\
+		where(idempotency_keys.c.key == key)
+	result = await session.execute(query)
+	row = result.fetchone()
+	await session.rollback()
+	expires_at = time.monotonic() + IDEMPOTENCY_TTL.total_seconds() - float(row.age)
+	return expires_at, row.request_hash, row.response
+
+
+async def purge_expired_keys(session: AsyncSession) -> int:
+	"""
+
+	Функция, которая удаляет просроченные ключи идемпотентности.
+
+	Принимает 1 аргумент:
+	- session - экземпляр, который обеспечивает асинхронное взаимодействие с БД.
+
+	Возвращает количество удалённых ключей.
+
+	"""
+	result = await session.execute(delete(idempotency_keys).where(expired_keys_condition()))
+	await session.commit()
+	return result.rowcount
+
+
+async def purge_expired_keys_periodically():
+	"""
+
+	Функция, которая раз в PURGE_INTERVAL секунд очищает таблицу idempotency_keys (запускается в lifespan).
+
+	"""
+	while True:
+		try:
+			async with async_session_maker() as session:
+				await purge_expired_keys(session)
+		except Exception:
+			logger.exception('Ошибка очистки просроченных ключей идемпотентности')
+		await asyncio.sleep(PURGE_INTERVAL)
+
+
+async def run_idempotent(key: str, data: BaseModel, session: AsyncSession,
+						 create: Callable[[Callable[[BaseModel], Awaitable[None]]], Awaitable]) -> dict:
+	"""
+
+	Функция, которая выполняет создание объекта не более одного раза для ключа идемпотентности.
+	Резерв ключа, создание объекта и сохранение ответа выполняются в одной транзакции: create вызывает
+	переданный ей before_commit(answer) перед своим session.commit(). Ответы с ошибкой не сохраняются -
+	транзакция откатывается вместе с резервом, и клиент может повторить запрос.
+
+	Принимает 4 аргумента:
+	- key - ключ идемпотентности (вместе с путём запроса).
+	- data - schema pydantic с данными запроса.
+	- session - экземпляр, который обеспечивает асинхронное взаимодействие с БД.
+	- create - функция, которая создаёт объект; принимает before_commit.
+
+	Возвращает ответ create или сохранённый ответ первого запроса с этим ключом.
+
+	"""
+	request_hash = hashlib.sha256(data.model_dump_json().encode()).hexdigest()
+	stored = _cache_get(key)
+	while stored is None and key in _in_flight:
+		stored = await asyncio.shield(_in_flight[key])
+	if stored is not None:
+		return _replay(stored, request_hash)
+
+	future = asyncio.get_running_loop().create_future()
+	_in_flight[key] = future
+	try:
+		reserved_at = time.monotonic()
+		stored = await _reserve(key, request_hash, session)
+		if stored is None:
+			saved = {}
+
+			async def save_response(answer: BaseModel):
+				response = jsonable_encoder(answer)
+				await session.execute(update(idempotency_keys).where(idempotency_keys.c.key == key).
+									  values(response=response))
+				saved['response'] = response
+
+			try:
+				answer = await create(save_response)
+			except Exception:
+				await session.rollback()
+				raise
+			response = jsonable_encoder(answer)
+			if 'response' not in saved or isinstance(response, dict) and 'error' in response:
+				# create вернула ошибку: транзакция откатана вместе с резервом ключа.
+				await session.rollback()
+				return answer
+			stored = reserved_at + IDEMPOTENCY_TTL.total_seconds(), request_hash, saved['response']
+		_cache_put(key, stored)
+		future.set_result(stored)
+		return _replay(stored, request_hash)
+	finally:
+		if not future.done():
+			future.set_result(None)
+		_in_flight.pop(key, None)
@@ -0,0 +1,42 @@
+from typing import Optional
+
+from sqlalchemy.exc import DBAPIError
+
+# Коды ошибок PostgreSQL (SQLSTATE).
+UNIQUE_VIOLATION = '23505'
+FOREIGN_KEY_VIOLATION = '23503'
+CHECK_VIOLATION = '23514'
+
+
+def get_sqlstate(error: DBAPIError) -> Optional[str]:
+	"""
+
+	Функция, которая получает код ошибки PostgreSQL (SQLSTATE) из исключения SQLAlchemy.
+
+	Принимает 1 аргумент:
+	- error - исключение DBAPIError (или IntegrityError).
+
+	Возвращает код ошибки или None.
+
+	"""
+	sqlstate = getattr(error.orig, 'sqlstate', None)
+	if sqlstate is None:
+		sqlstate = getattr(error.orig.__cause__, 'sqlstate', None)
+	return sqlstate
+
+
+def is_input_error(error: DBAPIError) -> bool:
+	"""
+
+	Функция, которая проверяет, вызвана ли ошибка некорректными входными данными: нарушение ограничений (класс 23)
+	или недопустимое значение (класс 22, например выход за пределы SmallInteger).
+	Ошибки подключения и прочие ошибки без SQLSTATE входными не считаются.
+
+	Принимает 1 аргумент:
+	- error - исключение DBAPIError (или IntegrityError).
+
+	Возвращает True | False.
+
+	"""
+	sqlstate = get_sqlstate(error)
+	return sqlstate is not None and sqlstate[:2] in ('22', '23')
@@ -1,5 +1,5 @@
-from sqlalchemy import Table, Column, String, Float, ForeignKey, SmallInteger, CheckConstraint
-from sqlalchemy import Integer
+from sqlalchemy import Table, Column, String, Float, ForeignKey, SmallInteger, CheckConstraint, JSON, DateTime, func
+from sqlalchemy import Integer, BigInteger
 
 from app.db.database import metadata
 
@@ -35,3 +35,19 @@ delivery_cars = Table(
 	Column('carrying', SmallInteger, nullable=False),
 	CheckConstraint('carrying >= 0 and carrying <= 1000', name='chk_carrying')
 )
+
+resource_versions = Table(
+	'resource_versions',
+	metadata,
+	Column('resource', String, primary_key=True),
+	Column('version', BigInteger, nullable=False, default=0)
+)
+
+idempotency_keys = Table(
+	'idempotency_keys',
+	metadata,
+	Column('key', String, primary_key=True),
+	Column('request_hash', String(64), nullable=False),
+	Column('response', JSON, nullable=True),
+	Column('created_at', DateTime, nullable=False, server_default=func.now(), index=True)
+)
@@ -1,10 +1,68 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
+from sqlalchemy import text
+from starlette.middleware.gzip import GZipMiddleware
+
+from app.api.formats import GZIP_MINIMUM_SIZE
 from app.api.goods.router import router as goods_router
+from app.api.goods.service import get_geodesic
 from app.api.delivery_car.router import router as delivery_car_router
+from app.api.health.router import router as health_router
+from app.api.idempotency import purge_expired_keys_periodically
+from app.db.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Пауза между попытками прогрева, если БД ещё недоступна.
+WARM_UP_RETRY_DELAY = 1
+
+
+async def warm_up(app: FastAPI):
+	"""
+
+	Функция, которая прогревает пул соединений с БД и geo-зависимости, после чего помечает приложение готовым.
+
+	Принимает 1 аргумент:
+	- app - экземпляр приложения FastAPI.
+
+	"""
+	while True:
+		connections = []
+		try:
+			for _ in range(engine.pool.size()):
+				connections.append(await engine.connect())
+			await asyncio.gather(*(connection.execute(text('SELECT 1')) for connection in connections))
+			await asyncio.to_thread(get_geodesic)
+			break
+		except Exception:
+			logger.exception('Ошибка прогрева приложения, повтор через %s с', WARM_UP_RETRY_DELAY)
+			await asyncio.sleep(WARM_UP_RETRY_DELAY)
+		finally:
+			for connection in connections:
+				await connection.close()
+	app.state.ready = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+	app.state.ready = False
+	tasks = [asyncio.create_task(warm_up(app)), asyncio.create_task(purge_expired_keys_periodically())]
+	yield
+	for task in tasks:
+		task.cancel()
+	for task in tasks:
+		with suppress(asyncio.CancelledError):
+			await task
+	await engine.dispose()
 
 
 def create_app():
-	app = FastAPI(title="Api_Transporting_Goods")
+	app = FastAPI(title="Api_Transporting_Goods", lifespan=lifespan)
+	app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
 	app.include_router(goods_router)
 	app.include_router(delivery_car_router)
+	app.include_router(health_router)
 	return app
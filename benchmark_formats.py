@@ -0,0 +1,80 @@
+import asyncio
+import gzip
+import random
+import sys
+import time
+
+import msgpack
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.api.delivery_car.schemas import GetDeliveryCar
+from app.api.formats import to_columns
+from app.api.goods.schemas import GetListGoods
+
+
+def make_goods(count: int) -> list[GetListGoods]:
+    return [GetListGoods(pick_up=random.randint(601, 99950), delivery=random.randint(601, 99950),
+                         car_count=random.randint(0, 20)) for _ in range(count)]
+
+
+def make_cars(count: int) -> list[GetDeliveryCar]:
+    return [GetDeliveryCar(id=index, number_car=f'{random.randint(0, 9999):04d}A',
+                           current_location=random.randint(601, 99950), carrying=random.randint(0, 1000))
+            for index in range(count)]
+
+
+def encode_json(items, model) -> bytes:
+    """
+
+    Функция, которая кодирует ответ так же, как эндпоинт: сериализация по response_model и JSONResponse.
+
+    """
+    field = create_response_field(name='response', type_=list[model])
+    content = asyncio.run(serialize_response(field=field, response_content=items))
+    return JSONResponse(content).body
+
+
+def encode_msgpack(items, model) -> bytes:
+    return msgpack.packb(to_columns(items, model))
+
+
+FORMATS = {
+    'json': encode_json,
+    # Уровень сжатия 9 - как у GZipMiddleware по умолчанию.
+    'json+gzip': lambda items, model: gzip.compress(encode_json(items, model), compresslevel=9),
+    'msgpack (колонки)': encode_msgpack,
+    'msgpack+gzip': lambda items, model: gzip.compress(encode_msgpack(items, model), compresslevel=9),
+}
+
+
+def benchmark(name: str, items, model):
+    """
+
+    Функция, которая сравнивает размер ответа и время кодирования для всех форматов.
+
+    Принимает 3 аргумента:
+    - name - название списка.
+    - items - список schema pydantic.
+    - model - класс schema pydantic.
+
+    """
+    print(f'{name}: {len(items)} строк')
+    print(f'{"формат":<20}{"размер, КБ":>14}{"кодирование, мс":>18}')
+    for format_name, encode in FORMATS.items():
+        start = time.perf_counter()
+        payload = encode(items, model)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f'{format_name:<20}{len(payload) / 1024:>14.1f}{elapsed:>18.1f}')
+    print()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    benchmark('GetListGoods', make_goods(count), GetListGoods)
+    benchmark('GetDeliveryCar', make_cars(count), GetDeliveryCar)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+
+def profile_imports(module: str = 'app.main', top: int = 20):
+    """
+
+    Функция, которая строит отчёт о времени импорта модулей при запуске приложения (python -X importtime).
+
+    Принимает 2 аргумента:
+    - module - импортируемый модуль.
+    - top - количество самых медленных модулей в отчёте.
+
+    Возвращает общее время импорта (мкс) и список кортежей (модуль, собственное время мкс, суммарное время мкс).
+
+    """
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=current_dir, capture_output=True, text=True, check=True)
+    report = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, cumulative, name = line.removeprefix('import time:').split('|')
+        report.append((name.strip(), int(self_time), int(cumulative)))
+    total = max((cumulative for _, _, cumulative in report), default=0)
+    report.sort(key=lambda row: row[2], reverse=True)
+    return total, report[:top]
+
+
+def main():
+    module = sys.argv[1] if len(sys.argv) > 1 else 'app.main'
+    total, report = profile_imports(module)
+    print(f'Время импорта {module}: {total / 1000:.1f} мс')
+    print(f'{"модуль":<50}{"собств., мс":>14}{"всего, мс":>12}')
+    for name, self_time, cumulative in report:
+        print(f'{name:<50}{self_time / 1000:>14.1f}{cumulative / 1000:>12.1f}')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import operator
+from collections import namedtuple
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Table, exc
+from sqlalchemy.sql import Delete, Insert, Select, Update, operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList, Extract, Grouping, Label
+from sqlalchemy.sql.functions import now
+from sqlalchemy.sql.schema import Column
+from sqlalchemy.sql.util import find_tables
+
+from app.db.models import resource_versions
+
+# Операторы SQL, которые не совпадают со своими аналогами в Python.
+SQL_OPERATORS = {
+    operators.in_op: lambda left, right: left in right,
+    operators.and_: lambda *values: all(values),
+}
+
+
+class FakeResult:
+    def __init__(self, rows=(), rowcount=0):
+        self._rows = list(rows)
+        self.rowcount = rowcount
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def scalar(self):
+        return self._rows[0][0] if self._rows else None
+
+
+class FakeSession:
+    """
+
+    Сессия, которая хранит таблицы в памяти и выполняет простые запросы SQLAlchemy Core к одной таблице.
+
+    Условия WHERE вычисляются по дереву выражения, а не по именам параметров, поэтому тесты не зависят
+    от того, как SQLAlchemy называет bind-параметры. Поддерживаются транзакции: первая запись после
+    commit/rollback запоминает состояние таблиц, rollback его восстанавливает, begin_nested работает как SAVEPOINT.
+    Ошибки запросов задаются через fail(тип запроса, таблица, ошибка).
+
+    """
+
+    def __init__(self):
+        self.tables: dict[str, list[dict]] = {}
+        self.errors: dict[tuple[str, str], list] = {}
+        self.statements: list[tuple[str, str]] = []
+        self.now = datetime(2024, 1, 1)
+        self.commits = 0
+        self.rollbacks = 0
+        self.savepoint_rollbacks = 0
+        self._snapshot = None
+
+    def add(self, table: Table, **values) -> dict:
+        row = self._new_row(table, values)
+        self.tables.setdefault(table.name, []).append(row)
+        return row
+
+    def rows(self, table: Table) -> list[dict]:
+        return self.tables.get(table.name, [])
+
+    def fail(self, kind: str, table: Table, *errors):
+        """
+
+        Функция, которая задаёт ошибки для очередных запросов kind (select | insert | update | delete) к таблице.
+        Строка считается кодом SQLSTATE: класс 23 вызывает IntegrityError, остальные - DBAPIError.
+
+        """
+        self.errors.setdefault((kind, table.name), []).extend(errors)
+
+    def age(self, table: Table, delta: timedelta):
+        # Сдвигает created_at всех строк таблицы в прошлое.
+        self.tables[table.name] = [{**row, 'created_at': row['created_at'] - delta} for row in self.rows(table)]
+
+    def count(self, kind: str, table: Table) -> int:
+        return self.statements.count((kind, table.name))
+
+    async def execute(self, stmt):
+        kind, table = self._target(stmt)
+        self.statements.append((kind, table.name if table is not None else None))
+        if table is not None:
+            self._raise_error(kind, table, stmt)
+        if isinstance(stmt, Select):
+            return self._select(stmt, table)
+        if self._snapshot is None:
+            self._snapshot = self._copy()
+        if isinstance(stmt, Insert):
+            return self._insert(stmt, table)
+        if isinstance(stmt, Update):
+            return self._update(stmt, table)
+        if isinstance(stmt, Delete):
+            return self._delete(stmt, table)
+        raise AssertionError(f'Неожиданный запрос: {stmt}')
+
+    async def commit(self):
+        self.commits += 1
+        self._snapshot = None
+
+    async def rollback(self):
+        self.rollbacks += 1
+        if self._snapshot is not None:
+            self.tables = self._snapshot
+            self._snapshot = None
+
+    @asynccontextmanager
+    async def begin_nested(self):
+        if self._snapshot is None:
+            self._snapshot = self._copy()
+        savepoint = self._copy()
+        try:
+            yield
+        except Exception:
+            self.savepoint_rollbacks += 1
+            self.tables = savepoint
+            raise
+
+    def _copy(self) -> dict[str, list[dict]]:
+        # Строки не изменяются на месте (UPDATE заменяет строку), поэтому достаточно копии списков.
+        return {name: list(rows) for name, rows in self.tables.items()}
+
+    @staticmethod
+    def _target(stmt):
+        if isinstance(stmt, Select):
+            froms = stmt.get_final_froms()
+            return 'select', froms[0] if len(froms) == 1 and isinstance(froms[0], Table) else None
+        return type(stmt).__name__.lower(), stmt.table
+
+    def _raise_error(self, kind: str, table: Table, stmt):
+        errors = self.errors.get((kind, table.name))
+        if not errors:
+            return
+        error = errors.pop(0)
+        raise self._error(error, stmt) if isinstance(error, str) else error
+
+    @staticmethod
+    def _error(sqlstate: str, stmt) -> exc.DBAPIError:
+        orig = Exception(f'SQLSTATE {sqlstate}')
+        orig.sqlstate = sqlstate
+        error_class = exc.IntegrityError if sqlstate.startswith('23') else exc.DBAPIError
+        return error_class(str(stmt), {}, orig)
+
+    def _new_row(self, table: Table, values: dict) -> dict:
+        row = {}
+        for column in table.c:
+            if column.name in values:
+                row[column.name] = values[column.name]
+            elif column.primary_key and column.autoincrement in ('auto', True) and column.type.python_type is int:
+                row[column.name] = max((other[column.name] for other in self.rows(table)), default=0) + 1
+            elif column.server_default is not None:
+                row[column.name] = self.now
+            elif column.default is not None and column.default.is_scalar:
+                row[column.name] = column.default.arg
+            else:
+                row[column.name] = None
+        return row
+
+    def _value(self, expr, row: dict):
+        return self._compile(expr)(row)
+
+    def _compile(self, expr):
+        """
+
+        Функция, которая переводит выражение SQLAlchemy в функцию от строки таблицы (dict).
+
+        """
+        if isinstance(expr, (Label, Grouping)):
+            return self._compile(expr.element)
+        if isinstance(expr, Column):
+            return operator.itemgetter(expr.name)
+        if isinstance(expr, BindParameter):
+            value = expr.effective_value
+            return lambda row: value
+        if isinstance(expr, now):
+            return lambda row: self.now
+        if isinstance(expr, Extract) and expr.field == 'epoch':
+            interval = self._compile(expr.expr)
+            return lambda row: interval(row).total_seconds()
+        if isinstance(expr, BinaryExpression):
+            function = SQL_OPERATORS.get(expr.operator, expr.operator)
+            left, right = self._compile(expr.left), self._compile(expr.right)
+            return lambda row: function(left(row), right(row))
+        if isinstance(expr, BooleanClauseList):
+            function = SQL_OPERATORS[expr.operator]
+            clauses = [self._compile(clause) for clause in expr.clauses]
+            return lambda row: function(*(clause(row) for clause in clauses))
+        raise AssertionError(f'Неподдерживаемое выражение: {expr!r}')
+
+    def _filter(self, stmt, rows: list[dict]) -> list[dict]:
+        if stmt.whereclause is None:
+            return list(rows)
+        condition = self._compile(stmt.whereclause)
+        return [row for row in rows if condition(row)]
+
+    def _result(self, columns, rows) -> FakeResult:
+        expanded = []
+        for column in columns:
+            expanded.extend(column.c if isinstance(column, Table) else [column])
+        row_class = namedtuple('Row', [column.name for column in expanded])
+        getters = [self._compile(column) for column in expanded]
+        return FakeResult([row_class(*(getter(row) for getter in getters)) for row in rows], rowcount=len(rows))
+
+    def _select(self, stmt, table) -> FakeResult:
+        if table is None:
+            # Запросы с JOIN не вычисляются: тесты выполняют их только на пустых таблицах.
+            joined = [joined_table for from_ in stmt.get_final_froms() for joined_table in find_tables(from_)]
+            assert not any(self.rows(joined_table) for joined_table in joined), f'Неподдерживаемый запрос: {stmt}'
+            return FakeResult()
+        rows = self._filter(stmt, self.rows(table))
+        return self._result(stmt.selected_columns, rows)
+
+    def _insert(self, stmt, table) -> FakeResult:
+        values = {getattr(key, 'name', key): self._value(value, {}) for key, value in stmt._values.items()}
+        row = self._new_row(table, values)
+        unique = [column.name for column in table.c if column.primary_key or column.unique]
+        if any(other[name] == row[name] for other in self.rows(table) for name in unique):
+            if stmt._post_values_clause is not None:
+                # ON CONFLICT DO NOTHING
+                return FakeResult()
+            raise self._error('23505', stmt)
+        self.tables.setdefault(table.name, []).append(row)
+        return self._result(stmt._returning, [row])
+
+    def _update(self, stmt, table) -> FakeResult:
+        rows = self.rows(table)
+        matched = {id(row) for row in self._filter(stmt, rows)}
+        updated = []
+        for position, row in enumerate(rows):
+            if id(row) in matched:
+                changes = {getattr(key, 'name', key): self._value(value, row) for key, value in stmt._values.items()}
+                rows[position] = {**row, **changes}
+                updated.append(rows[position])
+        return self._result(stmt._returning, updated)
+
+    def _delete(self, stmt, table) -> FakeResult:
+        rows = self.rows(table)
+        deleted = {id(row) for row in self._filter(stmt, rows)}
+        kept = [row for row in rows if id(row) not in deleted]
+        self.tables[table.name] = kept
+        return FakeResult(rowcount=len(rows) - len(kept))
+
+
+@pytest.fixture
+def session():
+    session = FakeSession()
+    # Версии ресурсов, как после миграции resource_versions.
+    session.add(resource_versions, resource='goods', version=0)
+    session.add(resource_versions, resource='delivery_cars', version=0)
+    return session
+
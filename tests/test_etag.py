@@ -0,0 +1,54 @@
+from fastapi.testclient import TestClient
+
+from app.db.database import get_async_session
+from app.main import create_app
+
+
+def set_versions(session, **versions):
+    session.tables['resource_versions'] = [{'resource': resource, 'version': version}
+                                           for resource, version in versions.items()]
+    return session
+
+
+def make_client(session):
+    app = create_app()
+
+    async def override():
+        yield session
+
+    app.dependency_overrides[get_async_session] = override
+    return TestClient(app)
+
+
+def test_list_returns_304_with_single_version_read(session):
+    set_versions(session, goods=3, delivery_cars=5)
+    response = make_client(session).get('/goods', headers={'If-None-Match': '"3-5"'})
+    assert response.status_code == 304
+    assert response.headers['etag'] == 'W/"3-5"'
+    assert session.statements == [('select', 'resource_versions')]
+
+
+def test_etag_changes_with_version(session):
+    set_versions(session, delivery_cars=2)
+    response = make_client(session).get('/delivery_cars', headers={'If-None-Match': '"1"'})
+    assert response.status_code == 200
+    assert response.headers['etag'] == 'W/"2"'
+    assert response.json() == []
+
+
+def test_msgpack_requires_positive_quality(session):
+    set_versions(session, delivery_cars=1)
+    client = make_client(session)
+    response = client.get('/delivery_cars', headers={'Accept': 'application/x-msgpack;q=0, application/json'})
+    assert response.headers['content-type'] == 'application/json'
+    response = client.get('/delivery_cars', headers={'Accept': 'application/json;q=0.5, application/x-msgpack'})
+    assert response.headers['content-type'] == 'application/x-msgpack'
+    assert response.headers['etag'] == 'W/"1-msgpack"'
+
+
+def test_goods_error_body_has_no_etag(session):
+    set_versions(session, goods=1, delivery_cars=1)
+    response = make_client(session).get('/goods', headers={'Accept': 'application/x-msgpack'})
+    assert response.headers['content-type'] == 'application/json'
+    assert 'error' in response.json()
+    assert 'etag' not in response.headers
@@ -0,0 +1,18 @@
+from fastapi.testclient import TestClient
+
+from app.main import create_app
+
+
+def test_ready_before_warm_up():
+    app = create_app()
+    response = TestClient(app).get('/ready')
+    assert response.status_code == 503
+    assert response.json() == {"status": "starting"}
+
+
+def test_ready_after_warm_up():
+    app = create_app()
+    app.state.ready = True
+    response = TestClient(app).get('/ready')
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready"}
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import time
+from datetime import timedelta
+
+import pytest
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from app.api import idempotency
+from app.api.delivery_car import service as delivery_car_service
+from app.api.delivery_car.number_pool import NumberCarPool
+from app.api.delivery_car.schemas import CreateDeliveryCar
+from app.api.goods.schemas import CreateGoods, ErrorResponse
+from app.api.goods.service import create_new_goods
+from app.db.errors import FOREIGN_KEY_VIOLATION, UNIQUE_VIOLATION
+from app.db.models import goods, delivery_cars, idempotency_keys
+
+DATA = CreateGoods(pick_up=601, delivery=602, weight=10, description='Груз')
+
+# Обрыв соединения (класс 08) - не ошибка входных данных.
+CONNECTION_FAILURE = '08006'
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    idempotency._cache.clear()
+    yield
+    idempotency._cache.clear()
+
+
+def create_goods(session, data=DATA):
+    return idempotency.run_idempotent('/goods:a', data, session,
+                                      lambda before_commit: create_new_goods(data, session, before_commit))
+
+
+def test_concurrent_duplicates_create_once(session):
+    async def main():
+        return await asyncio.gather(*(create_goods(session) for _ in range(5)))
+
+    answers = asyncio.run(main())
+    assert len(session.rows(goods)) == 1
+    assert all(answer == answers[0] for answer in answers)
+    assert session.rows(idempotency_keys)[0]['response'] == answers[0]
+
+
+def test_response_write_failure_creates_nothing(session):
+    session.fail('update', idempotency_keys, CONNECTION_FAILURE)
+    first = asyncio.run(create_goods(session))
+    assert isinstance(first, ErrorResponse)
+    # Груз и ключ откатываются вместе с несохранённым ответом.
+    assert session.rows(goods) == []
+    assert session.rows(idempotency_keys) == []
+
+    second = asyncio.run(create_goods(session))
+    idempotency._cache.clear()
+    third = asyncio.run(create_goods(session))
+    assert second == third == session.rows(idempotency_keys)[0]['response']
+    assert len(session.rows(goods)) == 1
+
+
+def test_error_response_is_not_stored(session):
+    session.fail('insert', goods, FOREIGN_KEY_VIOLATION)
+    first = asyncio.run(create_goods(session))
+    assert isinstance(first, ErrorResponse)
+    assert session.rows(idempotency_keys) == []
+    second = asyncio.run(create_goods(session))
+    assert second['id'] == 1
+
+
+def test_exception_rolls_back_key(session):
+    async def create(before_commit):
+        raise RuntimeError('сбой')
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(idempotency.run_idempotent('/goods:a', DATA, session, create))
+    assert session.rows(idempotency_keys) == []
+    assert asyncio.run(create_goods(session))['id'] == 1
+
+
+def test_stored_response_is_replayed_with_hash_check(session):
+    asyncio.run(create_goods(session))
+    idempotency._cache.clear()
+    other = CreateGoods(pick_up=601, delivery=602, weight=11, description='Груз')
+    answer = asyncio.run(create_goods(session, other))
+    assert answer == {"error": "Idempotency-Key уже использован с другими данными запроса"}
+    assert len(session.rows(goods)) == 1
+
+
+def test_replay_from_db_expires_with_row(session):
+    asyncio.run(create_goods(session))
+    idempotency._cache.clear()
+    session.age(idempotency_keys, idempotency.IDEMPOTENCY_TTL - timedelta(seconds=60))
+    asyncio.run(create_goods(session))
+    assert len(session.rows(goods)) == 1
+    expires_at = idempotency._cache['/goods:a'][0]
+    assert expires_at - time.monotonic() <= 60
+
+
+def test_expired_key_creates_again(session):
+    asyncio.run(create_goods(session))
+    idempotency._cache.clear()
+    session.age(idempotency_keys, idempotency.IDEMPOTENCY_TTL + timedelta(seconds=1))
+    asyncio.run(create_goods(session))
+    assert len(session.rows(goods)) == 2
+    assert len(session.rows(idempotency_keys)) == 1
+
+
+def test_car_collision_keeps_key_reservation(session, monkeypatch):
+    monkeypatch.setattr(delivery_car_service, 'number_car_pool', NumberCarPool())
+    session.fail('insert', delivery_cars, UNIQUE_VIOLATION)
+    data_car = CreateDeliveryCar(number_car='bad', current_location=601, carrying=10)
+    answer = asyncio.run(idempotency.run_idempotent(
+        '/delivery_cars:a', data_car, session,
+        lambda before_commit: delivery_car_service.create_new_delivery_car(data_car, session, before_commit)))
+    assert session.savepoint_rollbacks == 1
+    assert session.rows(idempotency_keys)[0]['response'] == answer
+    assert len(session.rows(delivery_cars)) == 1
+
+
+def test_purge_expired_keys(session):
+    session.add(idempotency_keys, key='old', request_hash='', response={})
+    session.age(idempotency_keys, idempotency.IDEMPOTENCY_TTL + timedelta(seconds=1))
+    session.add(idempotency_keys, key='new', request_hash='', response={})
+    assert asyncio.run(idempotency.purge_expired_keys(session)) == 1
+    assert [row['key'] for row in session.rows(idempotency_keys)] == ['new']
+
+
+def test_statements_compile_for_postgresql():
+    dialect = asyncpg.dialect()
+    reserve = str(idempotency.reserve_key_statement('k', 'h').compile(dialect=dialect))
+    assert reserve.endswith('ON CONFLICT (key) DO NOTHING RETURNING idempotency_keys.key')
+    expired = str(idempotency.expired_keys_condition().compile(dialect=dialect))
+    assert expired == 'idempotency_keys.created_at < now() - $1::INTERVAL'
+
+
+def test_response_is_stored_as_json():
+    dialect = asyncpg.dialect()
+    response = {'id': 1, 'pick_up': 601, 'delivery': 602, 'weight': 10, 'description': 'Груз'}
+    process = idempotency_keys.c.response.type.dialect_impl(dialect).bind_processor(dialect)
+    assert json.loads(process(response)) == response
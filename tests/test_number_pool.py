@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+from sqlalchemy import exc
+
+from app.api.delivery_car import service
+from app.api.delivery_car.number_pool import NumberCarPool, NumberPoolExhausted, POOL_CAPACITY, index_to_number, \
+    number_to_index
+from app.api.delivery_car.schemas import CreateDeliveryCar, ErrorResponse, GetDeliveryCar
+from app.db.errors import UNIQUE_VIOLATION, FOREIGN_KEY_VIOLATION
+from app.db.models import delivery_cars, resource_versions
+
+
+def add_cars(session, numbers):
+    first_id = len(session.rows(delivery_cars)) + 1
+    for car_id, number_car in enumerate(numbers, first_id):
+        session.add(delivery_cars, id=car_id, number_car=number_car, current_location=601, carrying=0)
+    return session
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = NumberCarPool()
+    monkeypatch.setattr(service, 'number_car_pool', pool)
+    return pool
+
+
+def test_index_round_trip():
+    assert number_to_index('0000A') == 0
+    assert number_to_index('9999Z') == POOL_CAPACITY - 1
+    assert index_to_number(number_to_index('1234K')) == '1234K'
+    assert number_to_index('12K34') is None
+
+
+def test_reserve_skips_numbers_in_db(pool, session):
+    add_cars(session, [index_to_number(index) for index in range(POOL_CAPACITY - 10)])
+    numbers = asyncio.run(pool.reserve(session, count=10))
+    assert sorted(numbers) == [index_to_number(index) for index in range(POOL_CAPACITY - 10, POOL_CAPACITY)]
+
+
+def test_reserve_raises_when_exhausted(pool, session):
+    add_cars(session, [index_to_number(index) for index in range(POOL_CAPACITY - 1)])
+    with pytest.raises(NumberPoolExhausted):
+        asyncio.run(pool.reserve(session, count=2))
+
+
+def test_release_returns_number_to_pool(pool, session):
+    add_cars(session, [index_to_number(index) for index in range(POOL_CAPACITY - 1)])
+    number, = asyncio.run(pool.reserve(session))
+    pool.release([number])
+    assert asyncio.run(pool.reserve(session)) == [number]
+
+
+def test_create_car_retries_after_collision(pool, session):
+    session.fail('insert', delivery_cars, UNIQUE_VIOLATION)
+    data_car = CreateDeliveryCar(number_car='bad', current_location=601, carrying=10)
+    answer = asyncio.run(service.create_new_delivery_car(data_car, session))
+    assert isinstance(answer, GetDeliveryCar)
+    # Коллизия откатывает только точку сохранения, транзакция продолжается.
+    assert session.savepoint_rollbacks == 1
+    assert session.rollbacks == 0
+    assert session.commits == 1
+    # Первая сверка - при загрузке пула, вторая - после коллизии.
+    assert session.count('select', delivery_cars) == 2
+    assert [row['number_car'] for row in session.rows(delivery_cars)] == [answer.number_car]
+    assert session.rows(resource_versions)[1] == {'resource': 'delivery_cars', 'version': 1}
+
+
+def test_create_car_maps_foreign_key_error(pool, session):
+    session.fail('insert', delivery_cars, FOREIGN_KEY_VIOLATION)
+    data_car = CreateDeliveryCar(number_car='1234A', current_location=1, carrying=10)
+    answer = asyncio.run(service.create_new_delivery_car(data_car, session))
+    assert answer == ErrorResponse(error='Локации 1 не существует')
+
+
+def test_refresh_marks_new_numbers_without_rebuilding(pool, session):
+    add_cars(session, ['0000A'])
+    asyncio.run(pool.reserve(session))
+    free = pool._free
+    add_cars(session, ['0001A'])
+    asyncio.run(pool.reserve(session, refresh=True))
+    assert pool._free is free
+    assert pool._last_id == 2
+    assert pool._used[number_to_index('0001A')] == 1
+
+
+def test_collided_number_is_not_released_when_refresh_fails(pool, session):
+    lost_connection = exc.DBAPIError('SELECT', {}, Exception('connection lost'))
+    session.fail('insert', delivery_cars, UNIQUE_VIOLATION)
+    data_car = CreateDeliveryCar(number_car='bad', current_location=601, carrying=10)
+
+    async def main():
+        # Пул загружается заранее, падает только сверка после коллизии.
+        number, = await pool.reserve(session)
+        pool.release([number])
+        session.fail('select', delivery_cars, lost_connection)
+        await service.create_new_delivery_car(data_car, session)
+
+    with pytest.raises(exc.DBAPIError):
+        asyncio.run(main())
+    assert pool._used[number_to_index(data_car.number_car)] == 1